@@ -13,6 +13,8 @@ default_mri_name = 'orig.mgz'  # brainmask would not help check expansion of sur
 default_seg_name = 'aparc+aseg.mgz'
 required_files = (default_mri_name, default_seg_name)
 default_source_of_features_freesurfer = 'whole_brain'
+# checking input files is dominated by filesystem latency (e.g. on NFS)
+num_threads_checking_inputs = 32
 
 num_cortical_surface_vis = 6
 position_histogram_freesurfer = [0.905, 0.7, 0.09, 0.1]
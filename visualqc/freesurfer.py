@@ -7,10 +7,10 @@ Module to present a base neuroimaging scan, currently T1 mri, without any overla
 import argparse
 import subprocess
 import sys
-import textwrap
 import traceback
 import warnings
 from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
 from os import makedirs
 from subprocess import check_output
 
@@ -19,8 +19,6 @@ import numpy as np
 from matplotlib import cm, colors, pyplot as plt
 from matplotlib.colors import is_color_like
 from matplotlib.widgets import RadioButtons, Slider
-from mrivis.color_maps import get_freesurfer_cmap
-from mrivis.utils import crop_to_seg_extents
 from os.path import exists as pexists, join as pjoin
 
 from visualqc import config as cfg
@@ -71,6 +69,10 @@ class FreesurferReviewInterface(BaseReviewInterface):
         self.unzoomable_axes = [self.radio_bt_rating.ax, self.text_box.ax,
                                 self.bt_next.ax, self.bt_quit.ax]
 
+        # figure without the overlays, to redraw only the overlays on alpha changes
+        self.background = None
+        self.fig.canvas.mpl_connect('draw_event', self.on_draw)
+
 
     def add_radio_buttons(self):
 
@@ -95,6 +97,16 @@ class FreesurferReviewInterface(BaseReviewInterface):
         self.slider = Slider(ax_slider, label='transparency',
                              valmin=0.0, valmax=1.0, valinit=0.7, valfmt='%1.2f')
         self.slider.label.set_position((0.99, 1.5))
+        # redrawing is handled in self.update(), instead of a full draw on each tick
+        self.slider.drawon = False
+        # parts changing with the value are kept out of the saved background,
+        #   and drawn along with the overlays (handle is absent in older matplotlib)
+        self.slider_artists = [art for art in (self.slider.poly,
+                                               getattr(self.slider, '_handle', None),
+                                               self.slider.valtext)
+                               if art is not None]
+        for art in self.slider_artists:
+            art.set_animated(True)
         self.slider.on_changed(self.set_alpha_value)
 
 
@@ -193,7 +205,32 @@ class FreesurferReviewInterface(BaseReviewInterface):
         else:
             pass
 
-        plt.draw()
+        self.fig.canvas.draw_idle()
+
+
+    def on_draw(self, event):
+        """Callback to save the background after each full draw of the figure."""
+
+        # overlays are animated artists, hence not part of the background
+        if self.fig.canvas.supports_blit:
+            self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+        # overlays must be drawn here even without blitting,
+        #   as animated artists are left out of the normal draw
+        self.draw_overlays()
+
+
+    def draw_overlays(self):
+        """Draws only the overlaid artists, on top of what is already drawn."""
+
+        for art in self.slider_artists:
+            self.fig.draw_artist(art)
+
+        for art in self.overlaid_artists:
+            # when zoomed in, other panels are hidden behind the zoomed-in axis
+            if self.zoomed_in and art.axes is not self.prev_axis:
+                continue
+            self.fig.draw_artist(art)
 
 
     def on_keyboard(self, key_in):
@@ -244,8 +281,14 @@ class FreesurferReviewInterface(BaseReviewInterface):
         for art in self.overlaid_artists:
             art.set_alpha(self.latest_alpha_seg)
 
-        # update figure
-        plt.draw()
+        if self.background is None:
+            # full draw, coalescing rapid slider events into a single redraw
+            self.fig.canvas.draw_idle()
+        else:
+            # repainting only the overlays on top of the saved background
+            self.fig.canvas.restore_region(self.background)
+            self.draw_overlays()
+            self.fig.canvas.blit(self.fig.bbox)
 
 
 class FreesurferRatingWorkflow(BaseWorkflowVisualQC, ABC):
@@ -300,6 +343,10 @@ class FreesurferRatingWorkflow(BaseWorkflowVisualQC, ABC):
 
         self.init_layout(views, num_rows_per_view, num_slices_per_view)
 
+        # images for upcoming units are read in the background during review
+        self.prefetch_pool = None
+        self.prefetched = dict()
+
         self.source_of_features = source_of_features
         self.init_getters()
 
@@ -403,6 +450,7 @@ class FreesurferRatingWorkflow(BaseWorkflowVisualQC, ABC):
                                          vmax=cfg.max_cmap_range_t1_mri, clip=True)
         self.mri_mapper = cm.ScalarMappable(norm=normalize_mri, cmap='gray')
 
+        from mrivis.color_maps import get_freesurfer_cmap
         fs_cmap = get_freesurfer_cmap(self.vis_type)
         # deciding colors for the whole image
         if self.label_set is not None and self.vis_type in cfg.label_types:
@@ -551,14 +599,39 @@ class FreesurferRatingWorkflow(BaseWorkflowVisualQC, ABC):
             self.current_alert_msg = None
 
 
-    def load_unit(self, unit_id):
-        """Loads the image data for display."""
+    def read_unit_images(self, unit_id):
+        """Reads the T1 mri and segmentation for a given unit from disk."""
 
         t1_mri_path = get_freesurfer_mri_path(self.in_dir, unit_id, self.mri_name)
         fs_seg_path = get_freesurfer_mri_path(self.in_dir, unit_id, self.seg_name)
 
         temp_t1_mri = read_image(t1_mri_path, error_msg='T1 mri')
-        temp_fs_seg = read_image(fs_seg_path, error_msg='segmentation')
+        # labels are integers - no need for a float copy of the entire volume
+        temp_fs_seg = read_image(fs_seg_path, error_msg='segmentation',
+                                 keep_dtype=True)
+
+        return temp_t1_mri, temp_fs_seg
+
+
+    def prefetch_unit(self, unit_id):
+        """Starts reading the images for the given unit in a background thread."""
+
+        if self.prefetch_pool is None:
+            # one unit ahead is enough to hide the reading time behind the review
+            self.prefetch_pool = ThreadPoolExecutor(max_workers=1)
+
+        self.prefetched[unit_id] = self.prefetch_pool.submit(self.read_unit_images,
+                                                             unit_id)
+
+
+    def load_unit(self, unit_id):
+        """Loads the image data for display."""
+
+        if unit_id in self.prefetched:
+            # errors in reading, if any, are re-raised here
+            temp_t1_mri, temp_fs_seg = self.prefetched.pop(unit_id).result()
+        else:
+            temp_t1_mri, temp_fs_seg = self.read_unit_images(unit_id)
 
         if temp_t1_mri.shape != temp_fs_seg.shape:
             raise ValueError('size mismatch! MRI: {} Seg: {}\n'
@@ -590,6 +663,10 @@ class FreesurferRatingWorkflow(BaseWorkflowVisualQC, ABC):
                   'does not contain requested label set!'.format(unit_id))
             return skip_subject
 
+        # imported here, as mrivis imports nibabel, which is slow and not needed
+        #   until images are read (e.g. not for --help or invalid arguments)
+        from mrivis.utils import crop_to_seg_extents
+
         # T1 mri must be rescaled - to avoid strange distributions skewing plots
         rescaled_t1_mri = scale_0to1(temp_t1_mri, cfg.max_cmap_range_t1_mri)
         self.current_t1_mri, self.current_seg = crop_to_seg_extents(rescaled_t1_mri,
@@ -639,12 +716,16 @@ class FreesurferRatingWorkflow(BaseWorkflowVisualQC, ABC):
                 # self.h_images_seg[ax_index].set_data(seg_rgb)
                 h_seg = plt.imshow(seg_rgba, interpolation='none',
                                    aspect='equal', origin='lower')
+                # animated: drawn separately by the UI, to enable blitting
+                h_seg.set_animated(True)
                 self.togglable_handles.append(h_seg)
                 # self.UI.data_handles.append(h_seg)
                 del seg_rgba
             elif 'contour' in self.vis_type:
                 h_seg = self.plot_contours_in_slice(slice_seg, self.axes[panel_index])
                 for contours in h_seg:
+                    for collection in contours.collections:
+                        collection.set_animated(True)
                     self.togglable_handles.extend(contours.collections)
                     # for clearing upon review
                     self.UI.data_handles.extend(contours.collections)
@@ -682,6 +763,15 @@ class FreesurferRatingWorkflow(BaseWorkflowVisualQC, ABC):
         # save ratings before exiting
         self.save_ratings()
 
+        if self.prefetch_pool is not None:
+            # cancelling only stops reads not yet started. A read already running
+            #   (typically the unit after the last reviewed one) can not be stopped,
+            #   and the interpreter waits for it at exit, so quitting may be delayed
+            #   by the time it takes to read one unit.
+            for future in self.prefetched.values():
+                future.cancel()
+            self.prefetch_pool.shutdown(wait=False)
+
         self.fig.canvas.mpl_disconnect(self.con_id_click)
         self.fig.canvas.mpl_disconnect(self.con_id_keybd)
         plt.close('all')
@@ -775,144 +865,147 @@ def run_tksurfer_script(in_dir, subject_id, hemi, script_file):
     return txt_out, exit_code
 
 
-def get_parser():
-    """Parser to specify arguments and their defaults."""
+# help text for the command line arguments (written without indentation
+#   to be shown as is by RawTextHelpFormatter)
+help_text_fs_dir = """
+Absolute path to ``SUBJECTS_DIR`` containing the finished runs of Freesurfer parcellation
+Each subject will be queried after its ID in the metadata file.
 
-    parser = argparse.ArgumentParser(prog="visualqc_freesurfer",
-                                     formatter_class=argparse.RawTextHelpFormatter,
-                                     description='visualqc_freesurfer: rate quality '
-                                                 'of Freesurfer reconstruction.')
+E.g. ``--fs_dir /project/freesurfer_v5.3``
+\n"""
 
-    help_text_fs_dir = textwrap.dedent("""
-    Absolute path to ``SUBJECTS_DIR`` containing the finished runs of Freesurfer parcellation
-    Each subject will be queried after its ID in the metadata file.
+help_text_user_dir = """
+Absolute path to an input folder containing the MRI scan. 
+Each subject will be queried after its ID in the metadata file, 
+and is expected to have the MRI (specified ``--mri_name``), 
+in its own folder under --user_dir.
 
-    E.g. ``--fs_dir /project/freesurfer_v5.3``
-    \n""")
+E.g. ``--user_dir /project/images_to_QC``
+\n"""
 
-    help_text_user_dir = textwrap.dedent("""
-    Absolute path to an input folder containing the MRI scan. 
-    Each subject will be queried after its ID in the metadata file, 
-    and is expected to have the MRI (specified ``--mri_name``), 
-    in its own folder under --user_dir.
+help_text_id_list = """
+Abs path to file containing list of subject IDs to be processed.
+If not provided, all the subjects with required files will be processed.
 
-    E.g. ``--user_dir /project/images_to_QC``
-    \n""")
+E.g.
 
-    help_text_id_list = textwrap.dedent("""
-    Abs path to file containing list of subject IDs to be processed.
-    If not provided, all the subjects with required files will be processed.
+.. parsed-literal::
 
-    E.g.
+    sub001
+    sub002
+    cn_003
+    cn_004
 
-    .. parsed-literal::
+\n"""
 
-        sub001
-        sub002
-        cn_003
-        cn_004
+help_text_mri_name = """
+Specifies the name of MRI image to serve as the reference slice.
+Typical options include orig.mgz, brainmask.mgz, T1.mgz etc.
+Make sure to choose the right vis_type.
 
-    \n""")
+Default: {} (within the mri folder of Freesurfer format).
+\n""".format(cfg.default_mri_name)
 
-    help_text_mri_name = textwrap.dedent("""
-    Specifies the name of MRI image to serve as the reference slice.
-    Typical options include orig.mgz, brainmask.mgz, T1.mgz etc.
-    Make sure to choose the right vis_type.
+help_text_seg_name = """
+Specifies the name of segmentation image (volumetric) to be overlaid on the MRI.
+Typical options include aparc+aseg.mgz, aseg.mgz, wmparc.mgz. 
+Make sure to choose the right vis_type. 
 
-    Default: {} (within the mri folder of Freesurfer format).
-    \n""".format(cfg.default_mri_name))
+Default: {} (within the mri folder of Freesurfer format).
+\n""".format(cfg.default_seg_name)
 
-    help_text_seg_name = textwrap.dedent("""
-    Specifies the name of segmentation image (volumetric) to be overlaid on the MRI.
-    Typical options include aparc+aseg.mgz, aseg.mgz, wmparc.mgz. 
-    Make sure to choose the right vis_type. 
+help_text_out_dir = """
+Output folder to store the visualizations & ratings.
+Default: a new folder called ``{}`` will be created inside the ``fs_dir``
+\n""".format(cfg.default_out_dir_name)
 
-    Default: {} (within the mri folder of Freesurfer format).
-    \n""".format(cfg.default_seg_name))
+help_text_vis_type = """
+Specifies the type of visualizations/overlay requested.
+Default: {} (volumetric overlay of cortical segmentation on T1 mri).
+\n""".format(cfg.default_vis_type)
 
-    help_text_out_dir = textwrap.dedent("""
-    Output folder to store the visualizations & ratings.
-    Default: a new folder called ``{}`` will be created inside the ``fs_dir``
-    \n""".format(cfg.default_out_dir_name))
+help_text_label = """
+Specifies the set of labels to include for overlay.
 
-    help_text_vis_type = textwrap.dedent("""
-    Specifies the type of visualizations/overlay requested.
-    Default: {} (volumetric overlay of cortical segmentation on T1 mri).
-    \n""".format(cfg.default_vis_type))
+Atleast one label must be specified when vis_type is labels_volumetric or labels_contour
 
-    help_text_label = textwrap.dedent("""
-    Specifies the set of labels to include for overlay.
+Default: None (show nothing)
+\n"""
 
-    Atleast one label must be specified when vis_type is labels_volumetric or labels_contour
+help_text_contour_color = """
+Specifies the color to use for the contours overlaid on MRI (when vis_type requested prescribes contours). 
+Color can be specified in many ways as documented in https://matplotlib.org/users/colors.html
+Default: {}.
+\n""".format(cfg.default_contour_face_color)
 
-    Default: None (show nothing)
-    \n""")
+help_text_alphas = """
+Alpha values to control the transparency of MRI and aseg. 
+This must be a set of two values (between 0 and 1.0) separated by a space e.g. --alphas 0.7 0.5. 
 
-    help_text_contour_color = textwrap.dedent("""
-    Specifies the color to use for the contours overlaid on MRI (when vis_type requested prescribes contours). 
-    Color can be specified in many ways as documented in https://matplotlib.org/users/colors.html
-    Default: {}.
-    \n""".format(cfg.default_contour_face_color))
+Default: {} {}.  Play with these values to find something that works for you and the dataset.
+\n""".format(cfg.default_alpha_mri, cfg.default_alpha_seg)
 
-    help_text_alphas = textwrap.dedent("""
-    Alpha values to control the transparency of MRI and aseg. 
-    This must be a set of two values (between 0 and 1.0) separated by a space e.g. --alphas 0.7 0.5. 
+help_text_views = """
+Specifies the set of views to display - could be just 1 view, or 2 or all 3.
+Example: --views 0 (typically sagittal) or --views 1 2 (axial and coronal)
+Default: {} {} {} (show all the views in the selected segmentation)
+\n""".format(cfg.default_views[0], cfg.default_views[1], cfg.default_views[2])
 
-    Default: {} {}.  Play with these values to find something that works for you and the dataset.
-    \n""".format(cfg.default_alpha_mri, cfg.default_alpha_seg))
+help_text_num_slices = """
+Specifies the number of slices to display per each view. 
+This must be even to facilitate better division.
+Default: {}.
+\n""".format(cfg.default_num_slices)
 
-    help_text_views = textwrap.dedent("""
-    Specifies the set of views to display - could be just 1 view, or 2 or all 3.
-    Example: --views 0 (typically sagittal) or --views 1 2 (axial and coronal)
-    Default: {} {} {} (show all the views in the selected segmentation)
-    \n""".format(cfg.default_views[0], cfg.default_views[1], cfg.default_views[2]))
+help_text_num_rows = """
+Specifies the number of rows to display per each axis. 
+Default: {}.
+\n""".format(cfg.default_num_rows)
 
-    help_text_num_slices = textwrap.dedent("""
-    Specifies the number of slices to display per each view. 
-    This must be even to facilitate better division.
-    Default: {}.
-    \n""".format(cfg.default_num_slices))
+help_text_no_surface_vis = """
+This flag disables batch-generation of 3d surface visualizations, which are shown along with cross-sectional overlays. This is not recommended, but could be used in situations where you do not have Freesurfer installed or want to focus solely on cross-sectional views.
 
-    help_text_num_rows = textwrap.dedent("""
-    Specifies the number of rows to display per each axis. 
-    Default: {}.
-    \n""".format(cfg.default_num_rows))
+Default: False (required visualizations are generated at the beginning, which can take 5-10 seconds for each subject).
+\n"""
 
-    help_text_no_surface_vis = textwrap.dedent("""
-    This flag disables batch-generation of 3d surface visualizations, which are shown along with cross-sectional overlays. This is not recommended, but could be used in situations where you do not have Freesurfer installed or want to focus solely on cross-sectional views.
+help_text_outlier_detection_method = """
+Method used to detect the outliers.
 
-    Default: False (required visualizations are generated at the beginning, which can take 5-10 seconds for each subject).
-    \n""")
+For more info, read http://scikit-learn.org/stable/modules/outlier_detection.html
 
-    help_text_outlier_detection_method = textwrap.dedent("""
-    Method used to detect the outliers.
+Default: {}.
+\n""".format(cfg.default_outlier_detection_method)
 
-    For more info, read http://scikit-learn.org/stable/modules/outlier_detection.html
+help_text_outlier_fraction = """
+Fraction of outliers expected in the given sample. Must be >= 1/n and <= (n-1)/n, 
+where n is the number of samples in the current sample.
 
-    Default: {}.
-    \n""".format(cfg.default_outlier_detection_method))
+For more info, read http://scikit-learn.org/stable/modules/outlier_detection.html
 
-    help_text_outlier_fraction = textwrap.dedent("""
-    Fraction of outliers expected in the given sample. Must be >= 1/n and <= (n-1)/n, 
-    where n is the number of samples in the current sample.
+Default: {}.
+\n""".format(cfg.default_outlier_fraction)
 
-    For more info, read http://scikit-learn.org/stable/modules/outlier_detection.html
+help_text_outlier_feat_types = """
+Type of features to be employed in training the outlier detection method.  It could be one of  
+'cortical' (aparc.stats: mean thickness and other geometrical features from each cortical label), 
+'subcortical' (aseg.stats: volumes of several subcortical structures), 
+or 'both' (using both aseg and aparc stats).
 
-    Default: {}.
-    \n""".format(cfg.default_outlier_fraction))
+Default: {}.
+\n""".format(cfg.t1_mri_features_OLD)
 
-    help_text_outlier_feat_types = textwrap.dedent("""
-    Type of features to be employed in training the outlier detection method.  It could be one of  
-    'cortical' (aparc.stats: mean thickness and other geometrical features from each cortical label), 
-    'subcortical' (aseg.stats: volumes of several subcortical structures), 
-    or 'both' (using both aseg and aparc stats).
+help_text_disable_outlier_detection = """
+This flag disables outlier detection and alerts altogether.
+\n"""
 
-    Default: {}.
-    \n""".format(cfg.t1_mri_features_OLD))
 
-    help_text_disable_outlier_detection = textwrap.dedent("""
-    This flag disables outlier detection and alerts altogether.
-    \n""")
+def get_parser():
+    """Parser to specify arguments and their defaults."""
+
+    parser = argparse.ArgumentParser(prog="visualqc_freesurfer",
+                                     formatter_class=argparse.RawTextHelpFormatter,
+                                     description='visualqc_freesurfer: rate quality '
+                                                 'of Freesurfer reconstruction.')
 
     in_out = parser.add_argument_group('Input and output', ' ')
 
@@ -5,13 +5,13 @@ import sys
 import warnings
 from genericpath import exists as pexists
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from os.path import realpath
 from os import makedirs
 from shutil import copyfile, which
 
-import nibabel as nib
 import numpy as np
-from os.path import basename, join as pjoin, realpath, splitext
+from os.path import abspath, basename, join as pjoin, realpath, splitext
 from pathlib import Path
 import visualqc.config as cfg
 from visualqc.config import default_out_dir_name, freesurfer_vis_cmd, \
@@ -21,16 +21,26 @@ from visualqc.config import default_out_dir_name, freesurfer_vis_cmd, \
 def read_image(img_spec,
                error_msg='image',
                num_dims=3,
-               reorient_canonical=True):
-    """Image reader. Removes stray values close to zero (smaller than 5 %ile)."""
+               reorient_canonical=True,
+               keep_dtype=False):
+    """Image reader. Removes stray values close to zero (smaller than 5 %ile).
+
+    Data is read through the array proxy of the image (without caching a
+    float64 copy), and is cast to float32 unless keep_dtype is True
+    (e.g. for segmentations, whose integer labels are better left as is).
+    """
 
     if isinstance(img_spec, str):
         if pexists(realpath(img_spec)):
-            hdr = nib.load(img_spec)
+            # imported only when needed: slow to import, and not needed for --help etc
+            import nibabel as nib
+            # memory-mapping is much slower when reading the entire volume,
+            #   which is what we always do here
+            hdr = nib.load(img_spec, mmap=False)
             # trying to stick to an orientation
             if reorient_canonical:
                 hdr = nib.as_closest_canonical(hdr)
-            img = hdr.get_data()
+            img = np.asanyarray(hdr.dataobj)
         else:
             raise IOError('Given path to {} does not exist!\n\t{}'
                           ''.format(error_msg, img_spec))
@@ -48,8 +58,8 @@ def read_image(img_spec,
     else:
         raise ValueError('Requested check for {} dims - allowed: 3 or 4!')
 
-    if not np.issubdtype(img.dtype, np.float64):
-        img = img.astype('float32')
+    if not keep_dtype and not np.issubdtype(img.dtype, np.float64):
+        img = img.astype('float32', copy=False)
 
     return img
 
@@ -273,6 +283,30 @@ def check_image_is_4d(img, min_num_volumes=1, name='4D image'):
     return
 
 
+def _make_symmetric_cortical_LUT(null_label=0):
+    """
+    Lookup table from Freesurfer LUT labels to symmetrized cortical labels,
+        with all other labels (subcortical etc) set to null.
+
+    """
+
+    left_baseline = 1000
+    right_baseline = 2000
+
+    # last entry (3000) stays null, to absorb all the labels beyond cortex
+    lut = np.full(3001, null_label, dtype='int32')
+
+    # labels 1000 and 2000 are unknown, so making them background is okay!
+    # if not we need to make the baselines smaller by 1, to map 1000 and 2000 to 1
+    lut[left_baseline:2000] = np.arange(2000 - left_baseline)
+    lut[right_baseline:3000] = np.arange(3000 - right_baseline)
+
+    return lut
+
+
+_symmetric_cortical_LUT = _make_symmetric_cortical_LUT()
+
+
 def void_subcortical_symmetrize_cortical(aseg, null_label=0):
     """Sets Freesurfer LUT labels for subcortical segmentations (<1000) to null,
         and sets the left and rights parts of the same structure to the same label
@@ -281,18 +315,16 @@ def void_subcortical_symmetrize_cortical(aseg, null_label=0):
     """
 
     aseg = check_image_is_3d(aseg)
-    symmetric_aseg = np.full_like(aseg, null_label)
-
-    left_baseline = 1000
-    right_baseline = 2000
 
-    left_ctx = np.logical_and(aseg >= left_baseline, aseg < 2000)
-    right_ctx = np.logical_and(aseg >= right_baseline, aseg < 3000)
+    if null_label == 0:
+        lut = _symmetric_cortical_LUT
+    else:
+        lut = _make_symmetric_cortical_LUT(null_label)
 
-    # labels 1000 and 2000 are unknown, so making them background is okay!
-    # if not we need to make the baselines smaller by 1, to map 1000 and 2000 to 1
-    symmetric_aseg[left_ctx] = aseg[left_ctx] - left_baseline
-    symmetric_aseg[right_ctx] = aseg[right_ctx] - right_baseline
+    # single pass through the volume: labels beyond the LUT are mapped to its
+    #   last entry, which is null (as are negative values, mapped to the first)
+    lut_indices = np.clip(aseg, 0, lut.size - 1).astype(np.intp, copy=False)
+    symmetric_aseg = lut.take(lut_indices).astype(aseg.dtype, copy=False)
 
     roi_set_empty = False
     if np.count_nonzero(symmetric_aseg) < 1:
@@ -661,8 +693,7 @@ def check_id_list(id_list_in, in_dir, vis_type,
             raise IOError('unable to read the ID list.')
     else:
         # get all IDs in the given folder
-        id_list = [folder for folder in os.listdir(in_dir) if
-                   os.path.isdir(pjoin(in_dir, folder))]
+        id_list = list_subfolders(in_dir)
 
     if seg_name is not None:
         required_files = {'mri': mri_name, 'seg': seg_name}
@@ -677,13 +708,23 @@ def check_id_list(id_list_in, in_dir, vis_type,
     # useful to open external programs like tkmedit
     images_for_id = dict()
 
-    for subject_id in id_list:
+    # making it absolute once, instead of doing it for every path below
+    in_dir = abspath(in_dir)
+
+    def check_subject(subject_id):
         path_list = { img: get_path_for_subject(in_dir, subject_id, name,
                                                 vis_type, in_dir_type)
                         for img, name in required_files.items()
                     }
-        invalid = [pfile for pfile in path_list.values() if
-                   not pexists(pfile) or os.path.getsize(pfile) <= 0]
+        invalid = [pfile for pfile in path_list.values()
+                   if not exists_and_nonempty(pfile)]
+        return path_list, invalid
+
+    # checks are independent and latency-bound, hence run concurrently
+    with ThreadPoolExecutor(max_workers=cfg.num_threads_checking_inputs) as pool:
+        check_results = list(pool.map(check_subject, id_list))
+
+    for subject_id, (path_list, invalid) in zip(id_list, check_results):
         if len(invalid) > 0:
             id_list_err.append(subject_id)
             invalid_list.extend(invalid)
@@ -767,10 +808,28 @@ def check_id_list_with_regex(id_list_in, in_dir, name_pattern):
     return np.array(id_list_out), images_for_id
 
 
+def list_subfolders(in_dir):
+    """Returns the names of all the folders within a given folder."""
+
+    # scandir gets the file type along with the name, avoiding a stat per entry
+    return [entry.name for entry in os.scandir(in_dir) if entry.is_dir()]
+
+
+def exists_and_nonempty(file_path):
+    """Checks whether a file exists and is not empty, with a single stat call."""
+
+    try:
+        return os.stat(file_path).st_size > 0
+    except OSError:
+        return False
+
+
 def read_id_list(id_list_file):
-    """Read all lines and strip them of newlines/spaces."""
+    """Read all IDs, one per line, ignoring blank lines and surrounding whitespace."""
 
-    id_list = np.array([line.strip('\n ') for line in open(id_list_file)])
+    # single read, and split() handles \r\n line endings and trailing blank lines
+    with open(id_list_file) as id_file:
+        id_list = np.array(id_file.read().split())
 
     return id_list
 
@@ -813,14 +872,15 @@ def get_path_for_subject(in_dir, subject_id, req_file, vis_type, in_dir_type=Non
         vis_type in freesurfer_vis_types or in_dir_type in ['freesurfer', ]):
         out_path = get_freesurfer_mri_path(in_dir, subject_id, req_file)
     else:
-        out_path = realpath(pjoin(in_dir, subject_id, req_file))
+        out_path = abspath(pjoin(in_dir, subject_id, req_file))
 
     return out_path
 
 
 def get_freesurfer_mri_path(in_dir, subject_id, req_file):
 
-    return realpath(pjoin(in_dir, subject_id, 'mri', req_file))
+    # not resolving symlinks (realpath), as that costs a stat per path component
+    return abspath(pjoin(in_dir, subject_id, 'mri', req_file))
 
 
 def check_time(time_interval, var_name='time interval'):
@@ -6,10 +6,11 @@ Module to define base classes.
 
 import sys
 import traceback
+from os import SEEK_END
 from abc import ABC, abstractmethod
 from shutil import copyfile
 
-from os.path import exists as pexists, join as pjoin
+from os.path import exists as pexists, getsize, join as pjoin
 
 from visualqc import config as cfg
 from visualqc.utils import get_ratings_path_info, load_ratings_csv, summarize_ratings
@@ -52,6 +53,11 @@ class BaseWorkflowVisualQC(ABC):
         self.ratings = dict()
         self.notes = dict()
 
+        # file handle to save each rating as soon as it is recorded
+        self.ratings_stream = None
+        # set once ratings from previous sessions are backed up in this session
+        self.prev_ratings_backed_up = False
+
         self.outlier_method = outlier_method
         self.outlier_fraction = outlier_fraction
         self.outlier_feat_types = outlier_feat_types
@@ -143,7 +149,9 @@ class BaseWorkflowVisualQC(ABC):
         print('Saving ratings .. \n')
         ratings_file, prev_ratings_backup = get_ratings_path_info(self)
 
-        if pexists(ratings_file):
+        # backup must hold the ratings from before this session, so not overwriting it
+        #   once ratings from this session have been streamed to the ratings file
+        if pexists(ratings_file) and not self.prev_ratings_backed_up:
             copyfile(ratings_file, prev_ratings_backup)
 
         # add column names: subject_id,issue1:issue2:issue3,...,notes etc
@@ -175,27 +183,70 @@ class BaseWorkflowVisualQC(ABC):
     def loop_through_units(self):
         """Method to loop through the units (subject, session or run) to make it all work."""
 
-        for counter, unit_id in enumerate(self.incomplete_list):
+        self.open_ratings_stream()
+        try:
+            for counter, unit_id in enumerate(self.incomplete_list):
+
+                print('\nReviewing {}'.format(unit_id))
+                self.current_unit_id = unit_id
+                self.identify_unit(unit_id, counter)
+                self.add_alerts()
 
-            print('\nReviewing {}'.format(unit_id))
-            self.current_unit_id = unit_id
-            self.identify_unit(unit_id, counter)
-            self.add_alerts()
+                skip_subject = self.load_unit(unit_id)
+
+                # next unit is read in the background, while this one is being reviewed
+                if counter + 1 < len(self.incomplete_list):
+                    self.prefetch_unit(self.incomplete_list[counter + 1])
+
+                if skip_subject:
+                    print('Skipping current subject ..')
+                    continue
 
-            skip_subject = self.load_unit(unit_id)
+                self.display_unit()
+                self.show_fig_and_wait()
+                self.print_rating(unit_id)
+                # saving each rating to disk right away, to avoid loss of work due to crash etc
+                self.stream_rating(unit_id)
 
-            if skip_subject:
-                print('Skipping current subject ..')
-                continue
+                if self.quit_now:
+                    print('\nUser chosen to quit..')
+                    break
+        finally:
+            if self.ratings_stream is not None:
+                self.ratings_stream.close()
+                self.ratings_stream = None
 
-            self.display_unit()
-            self.show_fig_and_wait()
-            # TODO save each rating to disk right away to avoid loss of work due to crach etc
-            self.print_rating(unit_id)
 
-            if self.quit_now:
-                print('\nUser chosen to quit..')
-                break
+    def open_ratings_stream(self):
+        """Opens the ratings file to append each rating as soon as it is recorded."""
+
+        ratings_file, prev_ratings_backup = get_ratings_path_info(self)
+
+        # backing up previous ratings, before this session appends to them
+        if pexists(ratings_file):
+            copyfile(ratings_file, prev_ratings_backup)
+        self.prev_ratings_backed_up = True
+
+        # ratings saved at the end of a session do not end with a newline
+        needs_newline = False
+        if pexists(ratings_file) and getsize(ratings_file) > 0:
+            with open(ratings_file, 'rb') as rf:
+                rf.seek(-1, SEEK_END)
+                needs_newline = rf.read(1) != b'\n'
+
+        # line-buffered, so each rating reaches the disk as soon as it is written
+        self.ratings_stream = open(ratings_file, 'a', buffering=1)
+        if needs_newline:
+            self.ratings_stream.write('\n')
+
+
+    def stream_rating(self, unit_id):
+        """Appends the rating for the given unit to the ratings file, if rated."""
+
+        # ratings not to be recorded are dropped by self.print_rating()
+        if unit_id in self.ratings:
+            self.ratings_stream.write('{},{},{}\n'.format(
+                unit_id, self._join_ratings(self.ratings[unit_id]), self.notes[unit_id]))
 
 
     def identify_unit(self, unit_id, counter):
@@ -247,6 +298,18 @@ class BaseWorkflowVisualQC(ABC):
         """
 
 
+    def prefetch_unit(self, unit_id):
+        """
+        Method to start reading the data for the next unit in the background.
+
+        Does nothing by default. Can be overridden by the child class,
+            when loading a unit is slow (e.g. reading large volumes from disk).
+
+        """
+
+        pass
+
+
     @abstractmethod
     def display_unit(self):
         """Display routine."""